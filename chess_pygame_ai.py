@@ -1,13 +1,19 @@
 import sys
+import time
 import random
 import pygame
-from typing import List, Tuple, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 # ---- Configs ----
 WIDTH, HEIGHT = 640, 640
 ROWS, COLS = 8, 8
 SQ = WIDTH // COLS
 FPS = 60
+MAX_DEPTH = 8  # deepest iteration of the AI search
+AI_TIME_BUDGET = 0.1  # seconds the AI may think per move
+ASPIRATION = 50  # half-width of the aspiration window, in centipawns
 
 # Colors
 LIGHT = (238, 238, 210)  # light squares
@@ -24,212 +30,656 @@ UNICODE_PIECES = {
     'k': '\u265A', 'q': '\u265B', 'r': '\u265C', 'b': '\u265D', 'n': '\u265E', 'p': '\u265F',
 }
 
-# Material values for a simple evaluation (used by AI to prefer captures)
+# Material values for the evaluation (in pawns)
 VALUES = {
     'K': 0, 'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1,
     'k': 0, 'q': 9, 'r': 5, 'b': 3, 'n': 3, 'p': 1,
 }
 
-Board = List[List[str]]
-Move = Tuple[int, int, int, int]  # (r1, c1, r2, c2)
+# Integer piece encoding used on the board: 0 = empty, 1..6 white, 7..12 black
+PIECE_CHARS = ".PNBRQKpnbrqk"
+PIECE_ID = {ch: i for i, ch in enumerate(PIECE_CHARS)}
+EMPTY, WP, WN, WB, WR, WQ, WK, BP, BN, BB, BR, BQ, BK = range(13)
+PIECE_VALUES = [VALUES.get(ch, 0) for ch in PIECE_CHARS]
 
+MATE_SCORE = 100000
+INF = 10 ** 9
 
-def new_board() -> Board:
-    """Return initial chess board as 8x8 list of strings. Uppercase=White, lowercase=Black."""
-    # Note: row 0 at top, row increases downward. We'll have White at bottom (rows 6-7) moving up (r-1)
-    return [
-        list("rnbqkbnr"),
-        list("pppppppp"),
-        list("........"),
-        list("........"),
-        list("........"),
-        list("........"),
-        list("PPPPPPPP"),
-        list("RNBQKBNR"),
-    ]
+Move = int  # from_sq | to_sq << 6, with sq = r * 8 + c
+Undo = Tuple[int, int, bool]  # (moved piece, captured piece or EMPTY, promoted)
+MAX_MOVES = 256  # upper bound on pseudo-legal moves in any position (218 is the known maximum)
 
 
 def in_bounds(r: int, c: int) -> bool:
     return 0 <= r < ROWS and 0 <= c < COLS
 
 
-def is_white(piece: str) -> bool:
-    return piece.isupper()
-
-
-def is_black(piece: str) -> bool:
-    return piece.islower()
-
-
-def side_of(piece: str) -> Optional[str]:
-    if not piece or piece == '.':
-        return None
-    return 'w' if is_white(piece) else 'b'
-
-
-def generate_moves(board: Board, side: str) -> List[Move]:
-    """Generate pseudo-legal moves for the given side (no check verification)."""
-    moves: List[Move] = []
-
-    for r in range(ROWS):
-        for c in range(COLS):
-            piece = board[r][c]
-            if piece == '.':
-                continue
-            if side == 'w' and not is_white(piece):
-                continue
-            if side == 'b' and not is_black(piece):
-                continue
-
-            p = piece.lower()
-            if p == 'p':
-                moves.extend(gen_pawn(board, r, c, side))
-            elif p == 'n':
-                moves.extend(gen_knight(board, r, c, side))
-            elif p == 'b':
-                moves.extend(gen_bishop(board, r, c, side))
-            elif p == 'r':
-                moves.extend(gen_rook(board, r, c, side))
-            elif p == 'q':
-                moves.extend(gen_queen(board, r, c, side))
-            elif p == 'k':
-                moves.extend(gen_king(board, r, c, side))
-
-    return moves
-
-
-def gen_pawn(board: Board, r: int, c: int, side: str) -> List[Move]:
-    moves: List[Move] = []
-    dir = -1 if side == 'w' else 1
-    start_row = 6 if side == 'w' else 1
-
-    # Single push
-    r1 = r + dir
-    if in_bounds(r1, c) and board[r1][c] == '.':
-        moves.append((r, c, r1, c))
-        # Double push from start
-        r2 = r + 2 * dir
-        if r == start_row and in_bounds(r2, c) and board[r2][c] == '.' and board[r1][c] == '.':
-            moves.append((r, c, r2, c))
-
-    # Captures
-    for dc in (-1, 1):
-        cc = c + dc
-        rr = r + dir
-        if in_bounds(rr, cc):
-            target = board[rr][cc]
-            if target != '.' and side_of(target) and side_of(target) != side:
-                moves.append((r, c, rr, cc))
-
-    # Note: No en passant for simplicity
-    return moves
-
-
-def gen_knight(board: Board, r: int, c: int, side: str) -> List[Move]:
-    moves: List[Move] = []
-    jumps = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
-    for dr, dc in jumps:
-        rr, cc = r + dr, c + dc
-        if not in_bounds(rr, cc):
-            continue
-        target = board[rr][cc]
-        if target == '.' or side_of(target) != side:
-            moves.append((r, c, rr, cc))
-    return moves
-
-
-def slide_moves(board: Board, r: int, c: int, side: str, directions: List[Tuple[int, int]]) -> List[Move]:
-    moves: List[Move] = []
-    for dr, dc in directions:
+# ---- Bitboards ----
+# Square index sq = r * 8 + c (a8 = 0, h1 = 63); bit sq of a bitboard is set when that square is occupied.
+FULL = (1 << 64) - 1
+FILE_A = 0x0101010101010101  # column 0
+FILE_H = FILE_A << 7          # column 7
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+RANK_3 = 0xFF << 40  # white pawns land here after a single push from their start row
+RANK_6 = 0xFF << 16  # black pawns land here after a single push from their start row
+
+# Zobrist keys: one random 64-bit number per (piece, square), plus one for black to move
+ZOBRIST = [[random.getrandbits(64) for _ in range(64)] for _ in PIECE_CHARS]
+ZOBRIST_BLACK = random.getrandbits(64)
+
+
+@dataclass
+class Position:
+    """Board as one 64-bit mask per piece id, a 64-square mailbox of piece ids, cached occupancy
+    masks and the Zobrist hash."""
+    bb: List[int]
+    squares: List[int]
+    key: int = 0
+    white_occ: int = 0
+    black_occ: int = 0
+    all_occ: int = 0
+
+    def __post_init__(self):
+        self.update_occupancy()
+
+    def update_occupancy(self):
+        bb = self.bb
+        self.white_occ = bb[WP] | bb[WN] | bb[WB] | bb[WR] | bb[WQ] | bb[WK]
+        self.black_occ = bb[BP] | bb[BN] | bb[BB] | bb[BR] | bb[BQ] | bb[BK]
+        self.all_occ = self.white_occ | self.black_occ
+
+
+def _leaper_attacks(offsets: List[Tuple[int, int]]) -> List[int]:
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        mask = 0
+        for dr, dc in offsets:
+            if in_bounds(r + dr, c + dc):
+                mask |= 1 << ((r + dr) * 8 + c + dc)
+        table.append(mask)
+    return table
+
+
+def _ray_table(dr: int, dc: int) -> List[int]:
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        mask = 0
         rr, cc = r + dr, c + dc
         while in_bounds(rr, cc):
-            target = board[rr][cc]
-            if target == '.':
-                moves.append((r, c, rr, cc))
-            else:
-                if side_of(target) != side:
-                    moves.append((r, c, rr, cc))
-                break
+            mask |= 1 << (rr * 8 + cc)
             rr += dr
             cc += dc
-    return moves
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_attacks([(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)])
+KING_ATTACKS = _leaper_attacks([(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc])
+
+
+def _leaper_moves(attacks: List[int]) -> List[List[Tuple[int, int]]]:
+    """Per origin square, the (target bit, packed move) pairs of a leaper attack table."""
+    return [[(1 << to, sq | to << 6) for to in range(64) if attacks[sq] >> to & 1] for sq in range(64)]
+
+
+KNIGHT_MOVES = _leaper_moves(KNIGHT_ATTACKS)
+KING_MOVES = _leaper_moves(KING_ATTACKS)
+
+# Rays split by whether the square index grows along them: the nearest blocker is then the
+# lowest set bit (positive) or the highest set bit (negative) of ray & occupancy.
+BISHOP_DIRS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+ROOK_DIRS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+RAYS = {d: _ray_table(*d) for d in BISHOP_DIRS + ROOK_DIRS}
+RAY_NAMES = {(-1, 0): 'n', (1, 0): 's', (0, 1): 'e', (0, -1): 'w',
+             (-1, 1): 'ne', (-1, -1): 'nw', (1, 1): 'se', (1, -1): 'sw'}
+
+# Slider code is generated once at import with every direction unrolled and each ray table bound
+# as a default argument (a fast local), instead of looping over a list of directions per piece.
+_ATTACKS_TEMPLATE = """
+def {name}(sq, occ, {tables}):
+    attacks = 0
+{rays}
+    return attacks
+"""
+
+_GEN_TEMPLATE = """
+def {name}(board, side, out_buf, n, {tables}):
+    not_own = FULL ^ (board.white_occ if side == 'w' else board.black_occ)
+    occ = board.all_occ
+    sliders = board.bb[{piece} if side == 'w' else {piece} + 6]
+    while sliders:
+        lsb = sliders & -sliders
+        sq = lsb.bit_length() - 1
+        attacks = 0
+{rays}
+        n = _add_moves(out_buf, n, sq, attacks & not_own)
+        sliders ^= lsb
+    return n
+"""
+
+
+def _unrolled_rays(dirs: List[Tuple[int, int]], indent: str) -> str:
+    lines = []
+    for dr, dc in dirs:
+        table = 'ray_' + RAY_NAMES[(dr, dc)]
+        nearest = '(blockers & -blockers)' if dr * 8 + dc > 0 else 'blockers'
+        lines += [
+            f"ray = {table}[sq]",
+            "blockers = ray & occ",
+            "if blockers:",
+            f"    ray ^= {table}[{nearest}.bit_length() - 1]",
+            "attacks |= ray",
+        ]
+    return '\n'.join(indent + line for line in lines)
+
+
+def _define_slider(template: str, name: str, dirs: List[Tuple[int, int]], indent: str,
+                   **fields) -> Callable[..., int]:
+    """Compile `template` for `dirs` and return the resulting function."""
+    tables = ', '.join(f"ray_{RAY_NAMES[d]}=RAYS[{d!r}]" for d in dirs)
+    source = template.format(name=name, tables=tables, rays=_unrolled_rays(dirs, indent), **fields)
+    # Module globals so the body sees FULL / _add_moves; the function itself lands in a fresh namespace
+    namespace: Dict[str, Callable[..., int]] = {}
+    exec(compile(source, f'<slide:{name}>', 'exec'), globals(), namespace)
+    return namespace[name]
+
+
+# bishop_attacks(sq, occ) / rook_attacks(sq, occ) -> attack bitboard from sq given occupancy occ
+bishop_attacks = _define_slider(_ATTACKS_TEMPLATE, 'bishop_attacks', BISHOP_DIRS, ' ' * 4)
+rook_attacks = _define_slider(_ATTACKS_TEMPLATE, 'rook_attacks', ROOK_DIRS, ' ' * 4)
+
+
+def new_board() -> Position:
+    """Return initial chess position. Uppercase=White, lowercase=Black."""
+    # Note: row 0 at top, row increases downward. We'll have White at bottom (rows 6-7) moving up (r-1)
+    return board_from_rows([
+        "rnbqkbnr",
+        "pppppppp",
+        "........",
+        "........",
+        "........",
+        "........",
+        "PPPPPPPP",
+        "RNBQKBNR",
+    ])
+
+
+def board_from_rows(rows: List[str]) -> Position:
+    bb = [0] * len(PIECE_CHARS)
+    squares = [EMPTY] * 64
+    key = 0
+    for r, row in enumerate(rows):
+        for c, ch in enumerate(row):
+            piece = PIECE_ID[ch]
+            if piece != EMPTY:
+                sq = r * 8 + c
+                bb[piece] |= 1 << sq
+                squares[sq] = piece
+                key ^= ZOBRIST[piece][sq]
+    return Position(bb, squares, key)
+
+
+def piece_at(board: Position, r: int, c: int) -> int:
+    return board.squares[r * 8 + c]
+
+
+def decode_move(move: Move) -> Tuple[int, int, int, int]:
+    frm, to = move & 63, move >> 6
+    return frm >> 3, frm & 7, to >> 3, to & 7
+
+
+def _add_moves(out_buf: List[Move], n: int, sq: int, targets: int) -> int:
+    while targets:
+        lsb = targets & -targets
+        out_buf[n] = sq | (lsb.bit_length() - 1) << 6
+        n += 1
+        targets ^= lsb
+    return n
+
+
+def _add_shifted(out_buf: List[Move], n: int, targets: int, delta: int) -> int:
+    """Add one move per target bit, coming from target + delta."""
+    while targets:
+        lsb = targets & -targets
+        to = lsb.bit_length() - 1
+        out_buf[n] = (to + delta) | to << 6
+        n += 1
+        targets ^= lsb
+    return n
+
+
+def generate_moves(board: Position, side: str, out_buf: List[Move]) -> int:
+    """Write pseudo-legal moves for the given side (no check verification) into out_buf.
+
+    out_buf must hold MAX_MOVES entries; returns the number of moves written.
+    """
+    n = gen_pawn(board, side, out_buf, 0)
+    n = gen_knight(board, side, out_buf, n)
+    n = gen_bishop(board, side, out_buf, n)
+    n = gen_rook(board, side, out_buf, n)
+    n = gen_queen(board, side, out_buf, n)
+    return gen_king(board, side, out_buf, n)
+
+
+def move_list(board: Position, side: str) -> List[Move]:
+    """generate_moves into a fresh buffer, for callers outside the search."""
+    buf = [0] * MAX_MOVES
+    return buf[:generate_moves(board, side, buf)]
+
+
+def gen_pawn(board: Position, side: str, out_buf: List[Move], n: int) -> int:
+    empty = FULL ^ board.all_occ
+    if side == 'w':
+        pawns = board.bb[WP]
+        single = (pawns >> 8) & empty
+        double = ((single & RANK_3) >> 8) & empty
+        n = _add_shifted(out_buf, n, single, 8)
+        n = _add_shifted(out_buf, n, double, 16)
+        n = _add_shifted(out_buf, n, ((pawns & NOT_FILE_A) >> 9) & board.black_occ, 9)
+        n = _add_shifted(out_buf, n, ((pawns & NOT_FILE_H) >> 7) & board.black_occ, 7)
+    else:
+        pawns = board.bb[BP]
+        single = (pawns << 8) & empty
+        double = ((single & RANK_6) << 8) & empty
+        n = _add_shifted(out_buf, n, single, -8)
+        n = _add_shifted(out_buf, n, double, -16)
+        n = _add_shifted(out_buf, n, ((pawns & NOT_FILE_A) << 7) & board.white_occ, -7)
+        n = _add_shifted(out_buf, n, ((pawns & NOT_FILE_H) << 9) & board.white_occ, -9)
+    # Note: No en passant for simplicity
+    return n
 
 
-def gen_bishop(board: Board, r: int, c: int, side: str) -> List[Move]:
-    dirs = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-    return slide_moves(board, r, c, side, dirs)
+def _own(board: Position, side: str) -> int:
+    return board.white_occ if side == 'w' else board.black_occ
 
 
-def gen_rook(board: Board, r: int, c: int, side: str) -> List[Move]:
-    dirs = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-    return slide_moves(board, r, c, side, dirs)
+def _pieces(board: Position, side: str, piece: int) -> int:
+    """Bitboard of `side`'s pieces of the kind given by its white id."""
+    return board.bb[piece if side == 'w' else piece + 6]
 
 
-def gen_queen(board: Board, r: int, c: int, side: str) -> List[Move]:
-    dirs = [(1, 1), (1, -1), (-1, 1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)]
-    return slide_moves(board, r, c, side, dirs)
+def _gen_leaper(board: Position, side: str, out_buf: List[Move], n: int, piece: int,
+                table: List[List[Tuple[int, int]]]) -> int:
+    own = _own(board, side)
+    leapers = _pieces(board, side, piece)
+    while leapers:
+        lsb = leapers & -leapers
+        for bit, move in table[lsb.bit_length() - 1]:
+            if not own & bit:
+                out_buf[n] = move
+                n += 1
+        leapers ^= lsb
+    return n
 
 
-def gen_king(board: Board, r: int, c: int, side: str) -> List[Move]:
-    moves: List[Move] = []
-    for dr in (-1, 0, 1):
-        for dc in (-1, 0, 1):
-            if dr == 0 and dc == 0:
-                continue
-            rr, cc = r + dr, c + dc
-            if not in_bounds(rr, cc):
-                continue
-            target = board[rr][cc]
-            if target == '.' or side_of(target) != side:
-                moves.append((r, c, rr, cc))
-    # No castling for simplicity
-    return moves
+def gen_knight(board: Position, side: str, out_buf: List[Move], n: int) -> int:
+    return _gen_leaper(board, side, out_buf, n, WN, KNIGHT_MOVES)
 
 
-def apply_move(board: Board, move: Move) -> Board:
-    r1, c1, r2, c2 = move
-    piece = board[r1][c1]
-    new_b = [row.copy() for row in board]
-    new_b[r1][c1] = '.'
-    new_b[r2][c2] = piece
+# gen_bishop/gen_rook/gen_queen(board, side, out_buf, n) -> n, with the same contract as gen_knight
+gen_bishop = _define_slider(_GEN_TEMPLATE, 'gen_bishop', BISHOP_DIRS, ' ' * 8, piece=WB)
+gen_rook = _define_slider(_GEN_TEMPLATE, 'gen_rook', ROOK_DIRS, ' ' * 8, piece=WR)
+gen_queen = _define_slider(_GEN_TEMPLATE, 'gen_queen', BISHOP_DIRS + ROOK_DIRS, ' ' * 8, piece=WQ)
 
-    # Pawn promotion (auto-queen)
-    if piece == 'P' and r2 == 0:
-        new_b[r2][c2] = 'Q'
-    if piece == 'p' and r2 == ROWS - 1:
-        new_b[r2][c2] = 'q'
-    return new_b
 
+def gen_king(board: Position, side: str, out_buf: List[Move], n: int) -> int:
+    # No castling for simplicity
+    return _gen_leaper(board, side, out_buf, n, WK, KING_MOVES)
+
+
+def make_move(board: Position, move: Move) -> Undo:
+    """Play `move` on `board` in place and return what unmake_move needs to take it back."""
+    frm, to = move & 63, move >> 6
+    moved = board.squares[frm]
+    captured = board.squares[to]
+    from_bit, to_bit = 1 << frm, 1 << to
+    bb = board.bb
+    key = board.key
+    if captured != EMPTY:
+        bb[captured] ^= to_bit
+        key ^= ZOBRIST[captured][to]
+    bb[moved] ^= from_bit
+    key ^= ZOBRIST[moved][frm]
 
-def has_moves(board: Board, side: str) -> bool:
-    return len(generate_moves(board, side)) > 0
+    # Pawn promotion (auto-queen)
+    placed = moved
+    if moved == WP and to < 8:
+        placed = WQ
+    elif moved == BP and to >= 56:
+        placed = BQ
+    bb[placed] |= to_bit
+    board.key = key ^ ZOBRIST[placed][to]
+    board.squares[frm] = EMPTY
+    board.squares[to] = placed
+
+    if moved <= WK:  # white mover
+        board.white_occ ^= from_bit | to_bit
+        board.black_occ &= FULL ^ to_bit
+    else:
+        board.black_occ ^= from_bit | to_bit
+        board.white_occ &= FULL ^ to_bit
+    board.all_occ = board.white_occ | board.black_occ
+    return moved, captured, placed != moved
+
+
+def unmake_move(board: Position, move: Move, undo: Undo):
+    """Take back `move`, restoring the mover (un-promoting it if needed) and any captured piece."""
+    frm, to = move & 63, move >> 6
+    moved, captured, promoted = undo
+    placed = moved + 4 if promoted else moved  # pawn id + 4 is the queen of the same colour
+    from_bit, to_bit = 1 << frm, 1 << to
+    bb = board.bb
+    bb[placed] ^= to_bit
+    bb[moved] |= from_bit
+    key = board.key ^ ZOBRIST[placed][to] ^ ZOBRIST[moved][frm]
+    captured_bit = 0
+    if captured != EMPTY:
+        bb[captured] |= to_bit
+        key ^= ZOBRIST[captured][to]
+        captured_bit = to_bit
+    board.key = key
+    board.squares[frm] = moved
+    board.squares[to] = captured
+
+    if moved <= WK:  # white mover
+        board.white_occ ^= from_bit | to_bit
+        board.black_occ |= captured_bit
+    else:
+        board.black_occ ^= from_bit | to_bit
+        board.white_occ |= captured_bit
+    board.all_occ = board.white_occ | board.black_occ
+
+
+# Buffer for callers that only need the move count
+_SCRATCH_MOVES = [0] * MAX_MOVES
+
+
+def any_move(board: Position, side: str) -> bool:
+    """True as soon as one pseudo-legal move is found, without generating the full move list."""
+    not_own = FULL ^ _own(board, side)
+    for piece, table in ((WN, KNIGHT_ATTACKS), (WK, KING_ATTACKS)):
+        leapers = _pieces(board, side, piece)
+        while leapers:
+            lsb = leapers & -leapers
+            if table[lsb.bit_length() - 1] & not_own:
+                return True
+            leapers ^= lsb
+
+    empty = FULL ^ board.all_occ
+    if side == 'w':
+        pawns = board.bb[WP]
+        captures = ((pawns & NOT_FILE_A) >> 9) | ((pawns & NOT_FILE_H) >> 7)
+        if (pawns >> 8) & empty or captures & board.black_occ:
+            return True
+    else:
+        pawns = board.bb[BP]
+        captures = ((pawns & NOT_FILE_A) << 7) | ((pawns & NOT_FILE_H) << 9)
+        if (pawns << 8) & empty or captures & board.white_occ:
+            return True
+
+    occ = board.all_occ
+    queens = _pieces(board, side, WQ)
+    for sliders, attacks in ((_pieces(board, side, WB) | queens, bishop_attacks),
+                             (_pieces(board, side, WR) | queens, rook_attacks)):
+        while sliders:
+            lsb = sliders & -sliders
+            if attacks(lsb.bit_length() - 1, occ) & not_own:
+                return True
+            sliders ^= lsb
+    return False
+
+
+def has_moves(board: Position, side: str) -> bool:
+    return any_move(board, side)
 
 
 # ---- AI ----
 
-def ai_choose_move(board: Board, side: str) -> Optional[Move]:
-    """Very simple AI: choose capture with highest value; otherwise random move."""
-    moves = generate_moves(board, side)
-    if not moves:
+# Transposition table: Zobrist key -> (depth, score, flag, best_move)
+TT_SIZE = 2 ** 20
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+TT: 'OrderedDict[int, Tuple[int, int, int, Optional[Move]]]' = OrderedDict()
+
+# time.monotonic() value at which the running search gives up
+_deadline = 0.0
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the AI's time budget runs out."""
+
+
+# One move buffer per search ply, reused across nodes and searches
+MAX_PLY = 64
+MOVE_BUFFERS = [[0] * MAX_MOVES for _ in range(MAX_PLY)]
+
+# Quiet-move ordering: two killer moves per ply, and history[piece][to_sq] bumped by depth^2 on cutoffs
+KILLERS: List[List[Optional[Move]]] = [[None, None] for _ in range(MAX_PLY)]
+NO_KILLERS: List[Optional[Move]] = [None, None]
+HISTORY: List[List[int]] = [[0] * 64 for _ in PIECE_CHARS]
+HISTORY_MAX = 8000  # stays below the killer bonus
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+def evaluate(board: Position, side: str) -> int:
+    """Material (in centipawns) plus mobility, scored from `side`'s point of view."""
+    bb = board.bb
+    score = 0
+    for piece in range(WP, WK + 1):
+        score += PIECE_VALUES[piece] * popcount(bb[piece])
+    for piece in range(BP, BK + 1):
+        score -= PIECE_VALUES[piece] * popcount(bb[piece])
+    mobility = generate_moves(board, 'w', _SCRATCH_MOVES) - generate_moves(board, 'b', _SCRATCH_MOVES)
+    score = score * 100 + mobility
+    return score if side == 'w' else -score
+
+
+def order_moves(board: Position, moves: List[Move], n: int,
+                killers: List[Optional[Move]] = NO_KILLERS) -> List[Move]:
+    """Order moves[:n]: captures by MVV-LVA, then killer moves, then quiet moves by history score."""
+    squares = board.squares
+    killer1, killer2 = killers
+
+    def key(m: Move) -> int:
+        target = squares[m >> 6]
+        if target == EMPTY:
+            if m == killer1 or m == killer2:
+                return 9000
+            return HISTORY[squares[m & 63]][m >> 6]
+        if target == WK or target == BK:
+            return 11000
+        return 10100 + PIECE_VALUES[target] * 10 - PIECE_VALUES[squares[m & 63]]
+    return sorted(moves[:n], key=key, reverse=True)
+
+
+def record_cutoff(board: Position, move: Move, depth: int, ply: int):
+    """Remember a quiet move that caused a beta cutoff as a killer for this ply and in the history table."""
+    if board.squares[move >> 6] != EMPTY:
+        return
+    killers = KILLERS[ply]
+    if killers[0] != move:
+        killers[1] = killers[0]
+        killers[0] = move
+    row = HISTORY[board.squares[move & 63]]
+    row[move >> 6] = min(row[move >> 6] + depth * depth, HISTORY_MAX)
+
+
+def tt_key(board: Position, side: str) -> int:
+    return board.key ^ ZOBRIST_BLACK if side == 'b' else board.key
+
+
+def tt_store(key: int, depth: int, score: int, flag: int, best_move: Optional[Move]):
+    if key not in TT and len(TT) >= TT_SIZE:
+        TT.popitem(last=False)  # evict the oldest entry
+    TT[key] = (depth, score, flag, best_move)
+
+
+def quiescence(board: Position, alpha: int, beta: int, side: str, ply: int) -> int:
+    """Search captures only until the position is quiet, so leaves are not scored mid-exchange."""
+    if not _pieces(board, side, WK):
+        return -MATE_SCORE
+    stand_pat = evaluate(board, side)
+    if stand_pat >= beta:
+        return beta
+    alpha = max(alpha, stand_pat)
+    if ply >= MAX_PLY - 1:
+        return alpha
+    if time.monotonic() > _deadline:
+        raise SearchTimeout
+
+    buf = MOVE_BUFFERS[ply]
+    squares = board.squares
+    n = 0
+    for m in buf[:generate_moves(board, side, buf)]:
+        if squares[m >> 6] != EMPTY:
+            buf[n] = m
+            n += 1
+
+    other = 'b' if side == 'w' else 'w'
+    for m in order_moves(board, buf, n):
+        undo = make_move(board, m)
+        try:
+            score = -quiescence(board, -beta, -alpha, other, ply + 1)
+        finally:
+            unmake_move(board, m, undo)
+        if score >= beta:
+            return beta
+        if score > alpha:
+            alpha = score
+    return alpha
+
+
+def negamax(board: Position, depth: int, alpha: int, beta: int, side: str, ply: int = 0) -> int:
+    # Pseudo-legal search: losing the king is how mate shows up. Prefer the slowest loss.
+    if not _pieces(board, side, WK):
+        return -MATE_SCORE - depth
+    if depth == 0:
+        return quiescence(board, alpha, beta, side, ply)
+    if time.monotonic() > _deadline:
+        raise SearchTimeout
+
+    key = tt_key(board, side)
+    entry = TT.get(key)
+    tt_move = None
+    if entry is not None:
+        tt_depth, tt_score, tt_flag, tt_move = entry
+        if tt_depth >= depth:
+            if tt_flag == TT_EXACT:
+                return tt_score
+            if tt_flag == TT_LOWER:
+                alpha = max(alpha, tt_score)
+            else:
+                beta = min(beta, tt_score)
+            if alpha >= beta:
+                return tt_score
+
+    buf = MOVE_BUFFERS[ply]
+    n = generate_moves(board, side, buf)
+    if n == 0:
+        return evaluate(board, side)
+    moves = order_moves(board, buf, n, KILLERS[ply])
+    if tt_move in moves:
+        moves.remove(tt_move)
+        moves.insert(0, tt_move)
+
+    alpha_orig = alpha
+    other = 'b' if side == 'w' else 'w'
+    best = -INF
+    best_move = None
+    for m in moves:
+        undo = make_move(board, m)
+        try:
+            score = -negamax(board, depth - 1, -beta, -alpha, other, ply + 1)
+        finally:
+            unmake_move(board, m, undo)
+        if score > best:
+            best = score
+            best_move = m
+        if score > alpha:
+            alpha = score
+        if alpha >= beta:
+            record_cutoff(board, m, depth, ply)
+            break
+
+    if best <= alpha_orig:
+        flag = TT_UPPER
+    elif best >= beta:
+        flag = TT_LOWER
+    else:
+        flag = TT_EXACT
+    tt_store(key, depth, best, flag, best_move)
+    return best
+
+
+def search_root(board: Position, side: str, moves: List[Move], depth: int, alpha: int,
+                beta: int) -> Tuple[int, Move, Dict[Move, int]]:
+    """One alpha-beta pass over the root moves in the given order.
+
+    Returns the best score and move plus the score of every child searched, which the caller uses to
+    order the root moves for the next iteration.
+    """
+    other = 'b' if side == 'w' else 'w'
+    best, best_move = -INF, moves[0]
+    child_scores: Dict[Move, int] = {}
+    for m in moves:
+        undo = make_move(board, m)
+        try:
+            score = -negamax(board, depth - 1, -beta, -alpha, other, 1)
+        finally:
+            unmake_move(board, m, undo)
+        child_scores[m] = score
+        if score > best:
+            best, best_move = score, m
+        if score > alpha:
+            alpha = score
+        if alpha >= beta:
+            break
+    return best, best_move, child_scores
+
+
+def ai_choose_move(board: Position, side: str) -> Optional[Move]:
+    """Iterative deepening negamax with aspiration windows, within AI_TIME_BUDGET seconds."""
+    global _deadline
+    buf = MOVE_BUFFERS[0]
+    n = generate_moves(board, side, buf)
+    if n == 0:
         return None
 
-    best_moves: List[Move] = []
-    best_score = -999
-    for m in moves:
-        r1, c1, r2, c2 = m
-        target = board[r2][c2]
-        score = 0
-        if target != '.':
-            # prefer capturing more valuable piece
-            score = VALUES[target]
-        if score > best_score:
-            best_score = score
-            best_moves = [m]
-        elif score == best_score:
-            best_moves.append(m)
-
-    # if none is a capture (best_score==0), still pick randomly among them
-    return random.choice(best_moves) if best_moves else random.choice(moves)
+    # Shuffle before the (stable) ordering so equal moves are not always tried in the same order
+    moves = buf[:n]
+    random.shuffle(moves)
+    # Killers are per ply of this search; history carries over but ages
+    for killers in KILLERS:
+        killers[0] = killers[1] = None
+    for row in HISTORY:
+        for to in range(64):
+            row[to] //= 2
+    moves = order_moves(board, moves, n)
+    best_move = moves[0]
+    _deadline = time.monotonic() + AI_TIME_BUDGET
+    prev = None
+    try:
+        for depth in range(1, MAX_DEPTH + 1):
+            if prev is None:
+                score, move, child_scores = search_root(board, side, moves, depth, -INF, INF)
+            else:
+                alpha, beta = prev - ASPIRATION, prev + ASPIRATION
+                score, move, child_scores = search_root(board, side, moves, depth, alpha, beta)
+                if score <= alpha or score >= beta:
+                    score, move, child_scores = search_root(board, side, moves, depth, -INF, INF)
+            prev, best_move = score, move
+            # Every root child now has a score from this pass (depth 1: its quiescence value), since a
+            # pass that failed outside the aspiration window was redone with a full window. Try them
+            # best-first next time.
+            moves.sort(key=lambda m: child_scores.get(m, -INF), reverse=True)
+    except SearchTimeout:
+        pass  # keep the best move of the last completed iteration
+    return best_move
 
 
 # ---- Rendering ----
@@ -241,36 +691,38 @@ def draw_board(screen: pygame.Surface):
             pygame.draw.rect(screen, color, (c * SQ, r * SQ, SQ, SQ))
 
 
-def draw_highlights(screen: pygame.Surface, selected: Optional[Tuple[int, int]], legal_moves: List[Move]):
-    # Selected square outline
-    if selected is not None:
-        r, c = selected
-        pygame.draw.rect(screen, HIGHLIGHT, (c * SQ, r * SQ, SQ, SQ))
-
-    # Moves
-    for (r1, c1, r2, c2) in legal_moves:
-        cx = c2 * SQ + SQ // 2
-        cy = r2 * SQ + SQ // 2
+def render_piece_sprites(font: pygame.font.Font) -> List[Optional[pygame.Surface]]:
+    """Rasterize each piece glyph once, indexed by piece id (None for EMPTY)."""
+    sprites: List[Optional[pygame.Surface]] = [None]
+    for ch in PIECE_CHARS[1:]:
+        sprites.append(font.render(UNICODE_PIECES[ch], True, TEXT_COLOR).convert_alpha())
+    return sprites
+
+
+def draw_square(screen: pygame.Surface, board_bg: pygame.Surface, board: Position,
+                sprites: List[Optional[pygame.Surface]], r: int, c: int,
+                selected: Optional[Tuple[int, int]], targets: Set[Tuple[int, int]]) -> pygame.Rect:
+    """Redraw one square straight onto the screen (board area starts at y=32) and return its screen rect."""
+    tile = pygame.Rect(c * SQ, r * SQ, SQ, SQ)
+    dest = tile.move(0, 32)
+    if selected == (r, c):
+        screen.fill(HIGHLIGHT, dest)
+    else:
+        screen.blit(board_bg, dest, tile)
+    if (r, c) in targets:
         # draw small dot for moves
-        pygame.draw.circle(screen, MOVE_DOT, (cx, cy), 8)
+        pygame.draw.circle(screen, MOVE_DOT, dest.center, 8)
+    piece = piece_at(board, r, c)
+    if piece != EMPTY:
+        surf = sprites[piece]
+        screen.blit(surf, surf.get_rect(center=dest.center))
+    return dest
 
 
-def draw_pieces(screen: pygame.Surface, board: Board, font: pygame.font.Font):
-    for r in range(ROWS):
-        for c in range(COLS):
-            piece = board[r][c]
-            if piece == '.':
-                continue
-            glyph = UNICODE_PIECES[piece]
-            surf = font.render(glyph, True, TEXT_COLOR)
-            rect = surf.get_rect(center=(c * SQ + SQ // 2, r * SQ + SQ // 2))
-            screen.blit(surf, rect)
-
-
-def render_info_panel(screen: pygame.Surface, turn: str, font_small: pygame.font.Font, status_text: str = ""):
+def render_info_panel(screen: pygame.Surface, panel_bg: pygame.Surface, turn: str,
+                      font_small: pygame.font.Font, status_text: str = ""):
     # Draw a top info bar with text
-    panel_rect = pygame.Rect(0, 0, WIDTH, 32)
-    pygame.draw.rect(screen, BG_PANEL, panel_rect)
+    screen.blit(panel_bg, (0, 0))
 
     turn_text = "Turn: White" if turn == 'w' else "Turn: Black"
     label = font_small.render(turn_text + (f"  {status_text}" if status_text else ""), True, (30, 30, 30))
@@ -279,16 +731,21 @@ def render_info_panel(screen: pygame.Surface, turn: str, font_small: pygame.font
 
 # ---- Input Helpers ----
 
-def mouse_to_square(pos: Tuple[int, int]) -> Optional[Tuple[int, int]]:
-    x, y = pos
-    if y < 32:  # info panel height
-        return None
-    y_adj = y - 32
-    r = y_adj // SQ
-    c = x // SQ
-    if in_bounds(r, c):
-        return (r, c)
-    return None
+# Moves of the last position the UI asked about, grouped by origin square and keyed by its Zobrist key
+_movegen_cache: Dict[int, Dict[Tuple[int, int], List[Move]]] = {}
+
+
+def moves_by_origin(board: Position, side: str) -> Dict[Tuple[int, int], List[Move]]:
+    key = tt_key(board, side)
+    by_origin = _movegen_cache.get(key)
+    if by_origin is None:
+        by_origin = {}
+        for m in move_list(board, side):
+            frm = m & 63
+            by_origin.setdefault((frm >> 3, frm & 7), []).append(m)
+        _movegen_cache.clear()
+        _movegen_cache[key] = by_origin
+    return by_origin
 
 
 # ---- Main Game ----
@@ -304,6 +761,13 @@ def main():
     except Exception:
         piece_font = pygame.font.SysFont(None, SQ - 8)
     info_font = pygame.font.SysFont(None, 22)
+    piece_sprites = render_piece_sprites(piece_font)
+
+    # Static backgrounds, painted once and blitted every frame
+    board_bg = pygame.Surface((WIDTH, HEIGHT)).convert()
+    draw_board(board_bg)
+    panel_bg = pygame.Surface((WIDTH, 32)).convert()
+    panel_bg.fill(BG_PANEL)
 
     clock = pygame.time.Clock()
 
@@ -315,6 +779,24 @@ def main():
 
     running = True
     status_text = ""
+    board_dirty = True  # end-of-game status needs recomputing
+
+    # Dirty-rect rendering: only squares in `dirty` (and the panel when its text changes) are redrawn
+    all_squares = {(r, c) for r in range(ROWS) for c in range(COLS)}
+    dirty: Set[Tuple[int, int]] = set(all_squares)
+    shown_panel: Optional[Tuple[str, str]] = None
+
+    def mark_selection():
+        if selected is not None:
+            dirty.add(selected)
+        for m in legal_for_selected:
+            to = m >> 6
+            dirty.add((to >> 3, to & 7))
+
+    def mark_move(m: Move):
+        r1, c1, r2, c2 = decode_move(m)
+        dirty.add((r1, c1))
+        dirty.add((r2, c2))
 
     while running:
         clock.tick(FPS)
@@ -323,19 +805,23 @@ def main():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                dirty |= all_squares
+                shown_panel = None
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if turn == 'w':  # human's turn
-                    sq = mouse_to_square(pygame.mouse.get_pos())
-                    if sq is None:
+                    x, y = event.pos
+                    r = (y - 32) // SQ  # clicks on the 32px info panel give r < 0
+                    c = x // SQ
+                    if not (0 <= r < ROWS and 0 <= c < COLS):
                         continue
-                    r, c = sq
+                    mark_selection()  # whatever happens, the old highlight goes away
                     if selected is None:
-                        piece = board[r][c]
-                        if piece != '.' and is_white(piece):
+                        piece = piece_at(board, r, c)
+                        if WP <= piece <= WK:
                             selected = (r, c)
-                            # compute legal moves for this piece only
-                            all_moves = generate_moves(board, 'w')
-                            legal_for_selected = [m for m in all_moves if m[0] == r and m[1] == c]
+                            # legal moves for this piece, from the per-position cache
+                            legal_for_selected = moves_by_origin(board, 'w').get((r, c), [])
                         else:
                             selected = None
                             legal_for_selected = []
@@ -343,8 +829,10 @@ def main():
                         # if click is a legal destination, make the move
                         made = False
                         for m in legal_for_selected:
-                            if (m[2], m[3]) == (r, c):
-                                board = apply_move(board, m)
+                            if m >> 6 == r * 8 + c:
+                                make_move(board, m)
+                                mark_move(m)
+                                board_dirty = True
                                 turn = 'b'
                                 selected = None
                                 legal_for_selected = []
@@ -353,28 +841,18 @@ def main():
                                 break
                         if not made:
                             # maybe reselect your own piece
-                            piece = board[r][c]
-                            if piece != '.' and is_white(piece):
+                            piece = piece_at(board, r, c)
+                            if WP <= piece <= WK:
                                 selected = (r, c)
-                                all_moves = generate_moves(board, 'w')
-                                legal_for_selected = [m for m in all_moves if m[0] == r and m[1] == c]
+                                legal_for_selected = moves_by_origin(board, 'w').get((r, c), [])
                             else:
                                 selected = None
                                 legal_for_selected = []
-
-        # After human move, AI moves automatically
-        if running and turn == 'b':
-            pygame.time.delay(200)  # small delay for UX
-            move = ai_choose_move(board, 'b')
-            if move is None:
-                status_text = "Black has no moves. Game over."
-                turn = 'w'
-            else:
-                board = apply_move(board, move)
-                turn = 'w'
+                    mark_selection()
 
         # Check end conditions (very basic): if a side has no legal moves
-        if running:
+        if running and board_dirty:
+            board_dirty = False
             if not has_moves(board, 'w'):
                 status_text = "White has no moves. Game over."
             if not has_moves(board, 'b'):
@@ -384,18 +862,32 @@ def main():
                     status_text = "Black has no moves. Game over."
 
         # Render
-        screen.fill((0, 0, 0))
-        render_info_panel(screen, turn, info_font, status_text)
-
-        # Chessboard area starts at y=32
-        board_surface = pygame.Surface((WIDTH, HEIGHT))
-        draw_board(board_surface)
-        if selected is not None:
-            draw_highlights(board_surface, selected, legal_for_selected)
-        draw_pieces(board_surface, board, piece_font)
-        screen.blit(board_surface, (0, 32))
-
-        pygame.display.flip()
+        rects: List[pygame.Rect] = []
+        if (turn, status_text) != shown_panel:
+            shown_panel = (turn, status_text)
+            render_info_panel(screen, panel_bg, turn, info_font, status_text)
+            rects.append(pygame.Rect(0, 0, WIDTH, 32))
+        if dirty:
+            targets = {decode_move(m)[2:] for m in legal_for_selected}
+            for r, c in dirty:
+                rects.append(draw_square(screen, board_bg, board, piece_sprites, r, c, selected, targets))
+            dirty.clear()
+        if rects:
+            pygame.display.update(rects)
+
+        # After human move, AI moves automatically. This runs after the frame showing the human's move
+        # has been drawn; the AI's reply is rendered on the next loop iteration.
+        if running and turn == 'b':
+            pygame.time.delay(200)  # small delay for UX
+            move = ai_choose_move(board, 'b')
+            if move is None:
+                status_text = "Black has no moves. Game over."
+                turn = 'w'
+            else:
+                make_move(board, move)
+                mark_move(move)
+                board_dirty = True
+                turn = 'w'
 
     pygame.quit()
     sys.exit()